@@ -1,4 +1,6 @@
 import os
+import time
+from functools import lru_cache
 from typing import List
 from dotenv import load_dotenv
 
@@ -15,20 +17,37 @@ from agentlite.logging.terminal_logger import AgentLogger
 # Actions are the tools that an agent can use.
 import duckduckgo_search
 
+# Search results are reused for repeated queries within this window
+SEARCH_CACHE_TTL_SECONDS = 3600
+# Per-request timeout for DuckDuckGo, so a stalled search can't hang an agent step
+SEARCH_TIMEOUT_SECONDS = 10
+
 class DuckDuckGoSearch(BaseAction):
     """A tool to search the web using DuckDuckGo."""
     def __init__(self) -> None:
         action_name = "DuckDuckGo_Search"
         action_desc = "Use this action to search for information on the web."
         params_doc = {"query": "A simple, direct search query."}
-        self.ddgs = duckduckgo_search.DDGS()
+        # A DDGS instance owns one HTTP client with keep-alive and a cookie store, so
+        # creating it once here lets every search reuse the same connection
+        self.ddgs = duckduckgo_search.DDGS(timeout=SEARCH_TIMEOUT_SECONDS)
+        # Memoize searches per instance. The time bucket is part of the key, so cached
+        # results expire after SEARCH_CACHE_TTL_SECONDS.
+        self._search = lru_cache(maxsize=256)(self._search_uncached)
         super().__init__(action_name, action_desc, params_doc)
 
     def __call__(self, query: str) -> str:
+        # Queries differing only in case or spacing share a cache entry
+        normalized_query = " ".join(query.lower().split())
+        summary = self._search(normalized_query, int(time.time()) // SEARCH_CACHE_TTL_SECONDS)
+        print(f"💡 Got search result: {summary[:150]}...")
+        return summary
+
+    def _search_uncached(self, query: str, time_bucket: int) -> str:
         print(f"\n🔎 Searching for: {query}")
-        results = self.ddgs.chat(query)
-        print(f"💡 Got search result: {results[:150]}...")
-        return results
+        # Plain web search: `DDGS.chat` would add a second, hidden LLM call to every step
+        results = self.ddgs.text(query, max_results=5)
+        return "\n\n".join(f"- {r['title']}: {r['body']}" for r in results)
 
 # --- Agent Definition ---
 # Agents have a role and a set of actions they can perform.
@@ -1,7 +1,7 @@
-import torch
-
 def main():
     """Verifies the PyTorch installation and checks for GPU availability."""
+    # Imported here rather than at module level, as torch takes seconds to import
+    import torch
 
     print(f"PyTorch Version: {torch.__version__}")
     print(f"TorchVision Version: N/A") # torchvision.__version__ is not always available
@@ -1,27 +1,68 @@
+from __future__ import annotations
+
 import os
-import json
-from openai import AzureOpenAI
+import orjson
+import asyncio
+import httpx
+from openai import AsyncAzureOpenAI
 from dotenv import load_dotenv
+from prompt_toolkit import PromptSession
+from llm_cache import ResponseCache
+
+# The "Reason" step is deterministic, so its result can be cached
+REASON_TEMPERATURE = 0.0
+# The final answer uses a higher temperature for more natural replies
+ANSWER_TEMPERATURE = 0.7
+RESPONSE_CACHE_FILE = ".cache/llm_cache.sqlite3"
+# The Reason and answer calls share one keep-alive connection pool (HTTP/2)
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=100)
 
 # --- 1. Tool Definition ---
+# Mock weather data, keyed by lowercase city name ("San Francisco, CA" looks up "san francisco").
+# The JSON is built once at import time.
+_CITY_WEATHER = {
+    "san francisco": orjson.dumps({"city": "San Francisco", "temperature": "75°F", "condition": "Sunny"}).decode(),
+    "new york": orjson.dumps({"city": "New York", "temperature": "68°F", "condition": "Cloudy"}).decode(),
+    "london": orjson.dumps({"city": "London", "temperature": "59°F", "condition": "Rainy"}).decode(),
+}
+
 def get_current_weather(city: str) -> str:
     """Gets the current weather for a given city."""
     # This is a mock tool. In a real application, this would call a weather API.
-    if "san francisco" in city.lower():
-        return json.dumps({"city": "San Francisco", "temperature": "75°F", "condition": "Sunny"})
-    elif "new york" in city.lower():
-        return json.dumps({"city": "New York", "temperature": "68°F", "condition": "Cloudy"})
-    elif "london" in city.lower():
-        return json.dumps({"city": "London", "temperature": "59°F", "condition": "Rainy"})
-    else:
-        return json.dumps({"city": city, "error": "City not found"})
+    weather = _CITY_WEATHER.get(city.split(",")[0].strip().lower())
+    if weather is None:
+        return orjson.dumps({"city": city, "error": "City not found"}).decode()
+    return weather
 
 AVAILABLE_TOOLS = {
     "get_current_weather": get_current_weather
 }
 
+# Tool schemas sent to the model, so it can request tool calls natively
+TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "get_current_weather",
+            "description": "Gets the current weather for a given city.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "city": {
+                        "type": "string",
+                        "description": "The city, e.g., San Francisco",
+                    }
+                },
+                "required": ["city"],
+            },
+        },
+    }
+]
+
+SYSTEM_PROMPT = "You are a helpful AI assistant. Use the available tools when you need them to answer the user's question."
+
 # --- 2. Main Application ---
-def main():
+async def main():
     """A basic AI agent that uses the ReAct pattern to accomplish tasks."""
     # --- Initialization ---
     load_dotenv()
@@ -34,110 +75,110 @@ def main():
         return
 
     try:
-        client = AzureOpenAI(
+        client = AsyncAzureOpenAI(
             api_key=api_key,
-            api_version="2024-02-01",
-            azure_endpoint=azure_endpoint
+            api_version="2024-02-15-preview", # Use a preview version that supports tool calling
+            azure_endpoint=azure_endpoint,
+            http_client=httpx.AsyncClient(http2=True, limits=HTTP_LIMITS)
         )
         print("✅ Azure OpenAI client initialized.")
     except Exception as e:
         print(f"Error initializing Azure OpenAI client: {e}")
         return
 
+    response_cache = ResponseCache(RESPONSE_CACHE_FILE)
+
     # --- Main Loop ---
     print("\n🚀 I am a basic AI agent. Ask me something that requires a tool.")
     print("   For example: 'What is the weather like in San Francisco?'")
     print("   Type 'exit' to end the application.")
     print("----------------------------------------------------------------")
 
+    # Reads input without blocking the event loop
+    session = PromptSession()
+
     while True:
-        user_query = input("\nYour request: ")
+        user_query = await session.prompt_async("\nYour request: ")
         if user_query.lower() == 'exit':
             print("\nExiting application. Goodbye!")
+            await client.close()
             break
         
         try:
             # --- ReAct (Reason + Act) Loop ---
             
-            # 1. Reason: The model decides if a tool is needed.
+            # 1. Reason: The model either answers directly or requests a tool call.
             print("\n🤔 Thinking...")
-            tool_call_request = reason_and_get_tool_call(client, chat_deployment, user_query)
+            assistant_message = await reason(client, chat_deployment, user_query, response_cache)
+            tool_calls = assistant_message.get("tool_calls")
 
             # 2. Act: If a tool is needed, execute it.
-            if tool_call_request:
-                tool_name = tool_call_request['name']
-                tool_args = tool_call_request['arguments']
-                print(f"🛠️ Using tool: {tool_name} with arguments {tool_args}")
-                
-                tool_function = AVAILABLE_TOOLS.get(tool_name)
-                if tool_function:
-                    tool_output = tool_function(**tool_args)
-                    print(f"💡 Tool output: {tool_output}")
-                else:
-                    tool_output = f"Error: Tool '{tool_name}' not found."
+            if tool_calls:
+                tool_messages = [run_tool(tool_call) for tool_call in tool_calls]
 
                 # 3. Final Response: The model uses the tool's output to generate a final answer.
-                final_answer = generate_final_answer(client, chat_deployment, user_query, tool_output)
+                final_answer = await generate_final_answer(client, chat_deployment, user_query, assistant_message, tool_messages)
             else:
-                # If no tool is needed, just generate a direct response.
-                print("No tool needed. Generating a direct response.")
-                final_answer = generate_final_answer(client, chat_deployment, user_query, tool_output=None)
+                # If no tool is needed, the model's reply already is the answer.
+                print("No tool needed.")
+                final_answer = assistant_message.get("content")
 
             print(f"\n🤖 Answer: {final_answer}")
 
         except Exception as e:
             print(f"An error occurred: {e}")
 
-def reason_and_get_tool_call(client, model, query: str) -> dict | None:
-    """The 'Reason' part of ReAct. Decides which tool to use and with what arguments."""
-    system_prompt = f"""
-You are an AI agent that can use tools to answer questions. Your goal is to determine if a tool is needed to answer the user's query and to provide the necessary JSON to call that tool.
-
-Available tools:
-- `get_current_weather(city: str)`: Gets the current weather for a given city.
-
-If the user's query requires a tool, respond with a JSON object like this:
-{{"tool_call": {{"name": "<tool_name>", "arguments": {{"<arg_name>": "<arg_value>"}}}}}}
-
-If no tool is needed, respond with:
-{{"tool_call": null}}
+async def reason(client, model, query: str, cache: ResponseCache) -> dict:
+    """The 'Reason' part of ReAct. Returns the model's reply, which may contain tool calls."""
+    cached = cache.get(query, SYSTEM_PROMPT, REASON_TEMPERATURE)
+    if cached is not None:
+        return orjson.loads(cached)
 
-Do not add any other text to your response.
-"""
-
-    response = client.chat.completions.create(
+    response = await client.chat.completions.create(
         model=model,
         messages=[
-            {"role": "system", "content": system_prompt},
+            {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": query}
         ],
-        temperature=0.0,
-        max_tokens=150
+        tools=TOOLS,
+        tool_choice="auto",
+        temperature=REASON_TEMPERATURE,
+        max_tokens=250
     )
-    
-    response_text = response.choices[0].message.content
-    response_json = json.loads(response_text)
-    return response_json.get("tool_call")
-
-def generate_final_answer(client, model, query: str, tool_output: str | None) -> str:
-    """Generates the final natural language response for the user."""
-    system_prompt = "You are a helpful AI assistant. Answer the user's question based on the information provided."
-    
-    if tool_output:
-        user_prompt = f"The user asked: '{query}'. A tool was run and returned this information: {tool_output}. Based on this, please provide a final, natural language answer."
+    # Stored as a plain dict, so cached and fresh replies are handled the same way
+    assistant_message = response.choices[0].message.model_dump(exclude_none=True)
+    cache.set(query, SYSTEM_PROMPT, REASON_TEMPERATURE, orjson.dumps(assistant_message).decode())
+    return assistant_message
+
+def run_tool(tool_call: dict) -> dict:
+    """The 'Act' part of ReAct. Executes a tool call and returns the tool message for the model."""
+    tool_name = tool_call["function"]["name"]
+    tool_args = orjson.loads(tool_call["function"]["arguments"])
+    print(f"🛠️ Using tool: {tool_name} with arguments {tool_args}")
+
+    tool_function = AVAILABLE_TOOLS.get(tool_name)
+    if tool_function:
+        tool_output = tool_function(**tool_args)
+        print(f"💡 Tool output: {tool_output}")
     else:
-        user_prompt = query # No tool was needed, just answer the query directly.
+        tool_output = f"Error: Tool '{tool_name}' not found."
+
+    return {"tool_call_id": tool_call["id"], "role": "tool", "name": tool_name, "content": tool_output}
 
-    response = client.chat.completions.create(
+async def generate_final_answer(client, model, query: str, assistant_message: dict, tool_messages: list[dict]) -> str:
+    """Generates the final natural language response for the user from the tool outputs."""
+    response = await client.chat.completions.create(
         model=model,
         messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": query},
+            assistant_message,
+            *tool_messages
         ],
-        temperature=0.7,
+        temperature=ANSWER_TEMPERATURE,
         max_tokens=250
     )
     return response.choices[0].message.content
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import time
+
+
+class ResponseCache:
+    """
+    An exact-match prompt/response cache for chat completions, stored in SQLite.
+
+    Responses are keyed on a hash of the system prompt and query. Only low-temperature
+    requests are cached, because higher temperatures are meant to produce varied answers.
+    """
+
+    def __init__(
+        self,
+        path: str = ".cache/llm_cache.sqlite3",
+        max_temperature: float = 0.2,
+        ttl_seconds: float | None = None,
+        disabled: bool = False,
+    ):
+        self.max_temperature = max_temperature
+        self.ttl_seconds = ttl_seconds
+        self.disabled = disabled
+
+        if self.disabled:
+            return
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT, created REAL)")
+
+    def get(self, query: str, system_prompt: str, temperature: float) -> str | None:
+        """Returns a cached response for the query, or None on a cache miss."""
+        if not self._enabled_for(temperature):
+            return None
+
+        row = self._db.execute(
+            "SELECT response, created FROM responses WHERE key = ?",
+            (self._key(system_prompt, query),),
+        ).fetchone()
+        if row is None or self._expired(row[1]):
+            return None
+        return row[0]
+
+    def set(self, query: str, system_prompt: str, temperature: float, response: str):
+        """Stores a response for the query."""
+        if not self._enabled_for(temperature) or not response:
+            return
+
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created) VALUES (?, ?, ?)",
+                (self._key(system_prompt, query), response, time.time()),
+            )
+
+    def _enabled_for(self, temperature: float) -> bool:
+        return not self.disabled and temperature <= self.max_temperature
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created > self.ttl_seconds
+
+    @staticmethod
+    def _key(system_prompt: str, query: str) -> str:
+        return hashlib.sha256(f"{system_prompt}\x00{query}".encode("utf-8")).hexdigest()
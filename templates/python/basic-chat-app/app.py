@@ -1,12 +1,24 @@
 import os
-from openai import AzureOpenAI
+import asyncio
+import httpx
+from openai import AsyncAzureOpenAI
 from dotenv import load_dotenv
+from prompt_toolkit import PromptSession
+from llm_cache import ResponseCache
 
-def main():
+# --- Configuration and Constants ---
+SYSTEM_PROMPT = "You are a helpful assistant."
+# The API default. Responses are only cached at 0.2 or below, so lower this to enable caching.
+TEMPERATURE = 1.0
+RESPONSE_CACHE_FILE = ".cache/llm_cache.sqlite3"
+# Chat turns reuse one shared keep-alive connection pool (HTTP/2) instead of reconnecting
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=100)
+
+async def main():
     """
     A simple chat application that demonstrates how to use the Azure OpenAI API.
 
-    This script loads credentials from a .env file, initializes the AzureOpenAI client,
+    This script loads credentials from a .env file, initializes the AsyncAzureOpenAI client,
     and enters a loop to chat with the model.
     """
     # Load environment variables from a .env file
@@ -27,46 +39,70 @@ def main():
 
     # Initialize the Azure OpenAI client
     try:
-        client = AzureOpenAI(
+        client = AsyncAzureOpenAI(
             api_key=api_key,
             api_version="2024-02-01",
-            azure_endpoint=azure_endpoint
+            azure_endpoint=azure_endpoint,
+            http_client=httpx.AsyncClient(http2=True, limits=HTTP_LIMITS)
         )
     except Exception as e:
         print(f"Error initializing Azure OpenAI client: {e}")
         return
 
     print("✅ Azure OpenAI client initialized successfully.")
+    response_cache = ResponseCache(RESPONSE_CACHE_FILE)
     print("🚀 You can now start chatting with the AI.")
     print("   Type 'exit' to end the conversation.")
     print("-----------------------------------------")
 
     # Start the chat loop
+    # Reads input without blocking the event loop
+    session = PromptSession()
+
     while True:
         try:
-            user_prompt = input("\nYou: ")
+            user_prompt = await session.prompt_async("\nYou: ")
             if user_prompt.lower() == 'exit':
                 print("\nExiting chat. Goodbye!")
                 break
 
-            # Send the prompt to the model
-            response = client.chat.completions.create(
+            # Reuse the answer if this exact prompt was already asked
+            cached = response_cache.get(user_prompt, SYSTEM_PROMPT, TEMPERATURE)
+            if cached is not None:
+                print(f"AI: {cached}")
+                continue
+
+            # Send the prompt to the model, streaming the response as it is generated
+            response = await client.chat.completions.create(
                 model=deployment_name,
                 messages=[
-                    {"role": "system", "content": "You are a helpful assistant."},
+                    {"role": "system", "content": SYSTEM_PROMPT},
                     {"role": "user", "content": user_prompt},
-                ]
+                ],
+                temperature=TEMPERATURE,
+                stream=True
             )
 
-            # Print the model's response
-            if response.choices:
-                print(f"AI: {response.choices[0].message.content}")
+            # Print each piece of the model's response as soon as it arrives
+            print("AI: ", end="", flush=True)
+            buf = []
+            async for chunk in response:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    print(delta, end="", flush=True)
+                    buf.append(delta)
+
+            if buf:
+                print()
+                response_cache.set(user_prompt, SYSTEM_PROMPT, TEMPERATURE, "".join(buf))
             else:
-                print("AI: I don't have a response for that.")
+                print("I don't have a response for that.")
 
         except Exception as e:
             print(f"An error occurred: {e}")
             break
 
+    await client.close()
+
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
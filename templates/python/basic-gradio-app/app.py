@@ -1,16 +1,37 @@
+from typing import List
+
 import gradio as gr
 
-def greet(name):
-    return "Hello, " + name + "!"
+# --- Configuration and Constants ---
+# Requests that arrive together are grouped into batches of up to this size
+MAX_BATCH_SIZE = 16
+# How many batches may be processed at the same time
+CONCURRENCY_LIMIT = 4
+# Requests beyond this many waiting in the queue are turned away
+MAX_QUEUE_SIZE = 64
+
+def greet_batch(names: List[str]) -> List[List[str]]:
+    """
+    Greets a whole batch of names at once.
+
+    With `batch=True`, Gradio passes a list of values for each input and expects a
+    list of results for each output. For a model, this turns many concurrent
+    requests into a single batched call.
+    """
+    return [[f"Hello, {name}!" for name in names]]
 
 iface = gr.Interface(
-    fn=greet, 
-    inputs="text", 
+    fn=greet_batch,
+    inputs="text",
     outputs="text",
     title="Simple Greeter",
-    description="Enter your name to get a greeting."
+    description="Enter your name to get a greeting.",
+    batch=True,
+    max_batch_size=MAX_BATCH_SIZE
 )
 
 if __name__ == "__main__":
+    # Batching requires the queue, which also limits how many batches run at once
+    iface.queue(default_concurrency_limit=CONCURRENCY_LIMIT, max_size=MAX_QUEUE_SIZE)
     # The launch() method creates a local web server and provides a public link if share=True
     iface.launch()
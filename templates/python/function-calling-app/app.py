@@ -1,24 +1,86 @@
+from __future__ import annotations
+
 import os
-import json
-from openai import AzureOpenAI
+import orjson
+import asyncio
+import functools
+import inspect
+import httpx
+from openai import AsyncAzureOpenAI
 from dotenv import load_dotenv
+from prompt_toolkit import PromptSession
+from llm_cache import ResponseCache
+
+# --- Configuration and Constants ---
+# Tool selection should be deterministic; this also lets answers be cached.
+TEMPERATURE = 0.0
+# The maximum number of tool calls that may run at the same time
+MAX_TOOL_CONCURRENCY = 5
+RESPONSE_CACHE_FILE = ".cache/llm_cache.sqlite3"
+# Tool selection and final answers go through one shared keep-alive connection pool (HTTP/2)
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=100)
 
 # --- 1. Tool Definition ---
+# Mock weather data, keyed by lowercase city name ("San Francisco, CA" looks up "san francisco").
+# The JSON is built once at import time.
+_CITY_WEATHER = {
+    "san francisco": orjson.dumps({"city": "San Francisco", "temperature": "75°F", "condition": "Sunny"}).decode(),
+    "new york": orjson.dumps({"city": "New York", "temperature": "68°F", "condition": "Cloudy"}).decode(),
+    "london": orjson.dumps({"city": "London", "temperature": "59°F", "condition": "Rainy"}).decode(),
+}
+
 def get_current_weather(city: str) -> str:
     """Gets the current weather for a given city."""
     # This is a mock tool. In a real application, this would call a weather API.
     print(f"Calling get_current_weather for {city}")
-    if "san francisco" in city.lower():
-        return json.dumps({"city": "San Francisco", "temperature": "75°F", "condition": "Sunny"})
-    elif "new york" in city.lower():
-        return json.dumps({"city": "New York", "temperature": "68°F", "condition": "Cloudy"})
-    elif "london" in city.lower():
-        return json.dumps({"city": "London", "temperature": "59°F", "condition": "Rainy"})
+    weather = _CITY_WEATHER.get(city.split(",")[0].strip().lower())
+    if weather is None:
+        return orjson.dumps({"city": city, "error": "City not found"}).decode()
+    return weather
+
+AVAILABLE_TOOLS = {
+    "get_current_weather": get_current_weather
+}
+
+class ConcurrentExecutor:
+    """Runs tool functions concurrently, with at most `max_concurrency` in flight at once."""
+    def __init__(self, max_concurrency: int = MAX_TOOL_CONCURRENCY):
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(self, function, **kwargs):
+        async with self._semaphore:
+            if inspect.iscoroutinefunction(function):
+                return await function(**kwargs)
+            # Run blocking tools in a worker thread so they don't stall the event loop
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, functools.partial(function, **kwargs))
+
+async def run_tool(tool_call: dict, executor: ConcurrentExecutor) -> dict:
+    """Executes a single tool call and returns the tool message to send back to the model."""
+    function_name = tool_call["function"]["name"]
+    function_to_call = AVAILABLE_TOOLS.get(function_name)
+    function_args = orjson.loads(tool_call["function"]["arguments"])
+
+    print(f"📞 Calling function: {function_name} with args: {function_args}")
+    if function_to_call:
+        function_response = await executor.run(function_to_call, **function_args)
     else:
-        return json.dumps({"city": city, "error": "City not found"})
+        function_response = f"Error: Tool '{function_name}' not found."
+    print(f"💡 Tool output: {function_response}")
+
+    return {
+        "tool_call_id": tool_call["id"],
+        "role": "tool",
+        "name": function_name,
+        "content": function_response,
+    }
+
+def conversation_key(messages: list[dict]) -> str:
+    """Serializes the conversation history so it can be used as part of a cache key."""
+    return orjson.dumps(messages).decode()
 
 # --- 2. Main Application ---
-def main():
+async def main():
     """An AI agent that uses the native OpenAI tool-calling feature."""
     # --- Initialization ---
     load_dotenv()
@@ -30,12 +92,15 @@ def main():
         print("Error: Please create a .env file and set all required environment variables.")
         return
 
-    client = AzureOpenAI(
+    client = AsyncAzureOpenAI(
         api_key=api_key,
         api_version="2024-02-15-preview", # Use a preview version that supports tool calling
-        azure_endpoint=azure_endpoint
+        azure_endpoint=azure_endpoint,
+        http_client=httpx.AsyncClient(http2=True, limits=HTTP_LIMITS)
     )
     print("✅ Azure OpenAI client initialized.")
+    response_cache = ResponseCache(RESPONSE_CACHE_FILE)
+    executor = ConcurrentExecutor()
 
     # --- Define Tools for the API ---
     tools = [
@@ -66,61 +131,66 @@ def main():
     print("   Type 'exit' to end the application.")
     print("----------------------------------------------------------------")
 
+    # Reads input without blocking the event loop
+    session = PromptSession()
+
     while True:
-        user_query = input("\nYour request: ")
+        user_query = await session.prompt_async("\nYour request: ")
         if user_query.lower() == 'exit':
             print("\nExiting application. Goodbye!")
+            await client.close()
             break
         
+        # The answer depends on the whole conversation so far, so use it as the cache context
+        history = conversation_key(messages)
         messages.append({"role": "user", "content": user_query})
 
         try:
             # --- Step 1: Send the conversation and available tools to the model ---
+            # Only this tool-selection step is cached; the tools themselves always run,
+            # so their output is never stale.
             print("\n🤔 Checking if a tool is needed...")
-            response = client.chat.completions.create(
-                model=chat_deployment,
-                messages=messages,
-                tools=tools,
-                tool_choice="auto",
-            )
-            response_message = response.choices[0].message
+            cached = response_cache.get(user_query, history, TEMPERATURE)
+            if cached is not None:
+                response_message = orjson.loads(cached)
+            else:
+                response = await client.chat.completions.create(
+                    model=chat_deployment,
+                    messages=messages,
+                    tools=tools,
+                    tool_choice="auto",
+                    temperature=TEMPERATURE,
+                )
+                # Stored as a plain dict, so cached and fresh replies are handled the same way
+                response_message = response.choices[0].message.model_dump(exclude_none=True)
+                response_cache.set(user_query, history, TEMPERATURE, orjson.dumps(response_message).decode())
 
             # --- Step 2: Check if the model wants to call a tool ---
-            if response_message.tool_calls:
+            tool_calls = response_message.get("tool_calls")
+            if tool_calls:
                 print("🛠️ Tool call requested by the model.")
                 # Append the assistant's response to the message history
                 messages.append(response_message)
 
-                # --- Step 3: Execute the tool call ---
-                for tool_call in response_message.tool_calls:
-                    function_name = tool_call.function.name
-                    function_to_call = globals().get(function_name)
-                    function_args = json.loads(tool_call.function.arguments)
-                    
-                    print(f"📞 Calling function: {function_name} with args: {function_args}")
-                    function_response = function_to_call(**function_args)
-                    print(f"💡 Tool output: {function_response}")
-
-                    # --- Step 4: Send the tool output back to the model ---
-                    messages.append(
-                        {
-                            "tool_call_id": tool_call.id,
-                            "role": "tool",
-                            "name": function_name,
-                            "content": function_response,
-                        }
-                    )
-                
+                # --- Step 3: Execute the tool calls concurrently ---
+                tool_messages = await asyncio.gather(
+                    *[run_tool(tool_call, executor) for tool_call in tool_calls]
+                )
+
+                # --- Step 4: Send the tool outputs back to the model (in the original order) ---
+                messages.extend(tool_messages)
+
                 # Get a new response from the model with the tool's output
                 print("💬 Getting final response from model...")
-                final_response = client.chat.completions.create(
+                final_response = await client.chat.completions.create(
                     model=chat_deployment,
                     messages=messages,
+                    temperature=TEMPERATURE,
                 )
                 final_answer = final_response.choices[0].message.content
             else:
                 # No tool needed, the model's response is the final answer
-                final_answer = response_message.content
+                final_answer = response_message.get("content")
 
             print(f"\n🤖 Answer: {final_answer}")
             messages.append({"role": "assistant", "content": final_answer})
@@ -129,4 +199,4 @@ def main():
             print(f"An error occurred: {e}")
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
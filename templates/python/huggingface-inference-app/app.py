@@ -1,8 +1,28 @@
 import os
-import torch
+import copy
+from typing import TYPE_CHECKING, Callable, Iterator
 from dotenv import load_dotenv
-from transformers import pipeline
-from huggingface_hub import login, HfApi
+
+# torch, transformers, vllm and huggingface_hub are slow to import, so they are imported
+# inside the functions that use them. Only the vLLM server backend (VLLM_BASE_URL) avoids
+# loading torch; the in-process vLLM engine depends on it.
+if TYPE_CHECKING:
+    import torch
+
+# --- Configuration and Constants ---
+MAX_NEW_TOKENS = 200
+TOP_K = 10
+# Upper bound on prompt + response length, used to size the static KV cache
+MAX_CACHE_LEN = 1024
+
+# Llama-2 chat prompt format. The system part never changes, so its tokens and KV
+# cache can be computed once at startup instead of on every request.
+SYSTEM_PROMPT = "You are a helpful, respectful and honest assistant. Keep your answers concise."
+PROMPT_PREFIX = f"[INST] <<SYS>>\n{SYSTEM_PROMPT}\n<</SYS>>\n\n"
+PROMPT_SUFFIX = " [/INST]"
+
+# A generator takes a prompt and yields the response text as it becomes available
+Generator = Callable[[str], Iterator[str]]
 
 # --- Main Application Logic ---
 def main():
@@ -10,6 +30,8 @@ def main():
     # 1. Load Environment Variables and Authenticate
     load_dotenv()
     hf_api_key = os.getenv("HUGGINGFACE_API_KEY")
+    backend = os.getenv("INFERENCE_BACKEND", "transformers").lower()
+    vllm_base_url = os.getenv("VLLM_BASE_URL")
 
     if not hf_api_key:
         print("Error: HUGGINGFACE_API_KEY not found.")
@@ -17,6 +39,7 @@ def main():
         return
 
     print("🔑 Authenticating with Hugging Face Hub...")
+    from huggingface_hub import login
     try:
         login(token=hf_api_key)
         print("✅ Authentication successful.")
@@ -24,21 +47,21 @@ def main():
         print(f"❌ Authentication failed: {e}")
         return
 
-    # 2. Setup Model and Pipeline
+    # 2. Setup Model and Tokenizer
     # We use a gated model to demonstrate the need for authentication.
     # IMPORTANT: You must visit the model's page on Hugging Face and accept the
     # license terms before you can use it.
     model_id = "meta-llama/Llama-2-7b-chat-hf"
-    print(f"\n🚀 Loading gated model: {model_id}")
+    print(f"\n🚀 Loading gated model: {model_id} (backend: {backend})")
     print("   This may take a significant amount of time and disk space on first run.")
 
     try:
-        text_generator = pipeline(
-            "text-generation",
-            model=model_id,
-            torch_dtype=torch.float16,
-            device_map="auto"
-        )
+        if backend == "vllm" and vllm_base_url:
+            generate = connect_vllm_server(vllm_base_url, model_id)
+        elif backend == "vllm":
+            generate = load_vllm_engine(model_id)
+        else:
+            generate = load_transformers_model(model_id)
         print("✅ Model loaded successfully.")
     except Exception as e:
         print(f"\n❌ Error loading model: {e}")
@@ -58,16 +81,125 @@ def main():
             print("\nExiting application. Goodbye!")
             break
 
-        print("\n💬 Generating response...")
-        sequences = text_generator(
-            user_prompt,
-            do_sample=True,
-            top_k=10,
-            num_return_sequences=1,
-            eos_token_id=text_generator.tokenizer.eos_token_id,
-            max_length=200,
+        try:
+            print("\n💬 Generating response...")
+            print("\n🤖 Assistant: ", end="", flush=True)
+            for text in generate(user_prompt):
+                print(text, end="", flush=True)
+            print()
+        except Exception as e:
+            print(f"\nAn error occurred: {e}")
+
+# --- Inference Backends ---
+
+def select_dtype() -> "torch.dtype":
+    """Picks bfloat16 where the hardware supports it, falling back to float16 on older GPUs."""
+    import torch
+
+    if torch.cuda.is_available() and not torch.cuda.is_bf16_supported():
+        return torch.float16
+    return torch.bfloat16
+
+def load_transformers_model(model_id: str) -> Generator:
+    """Loads the model in-process with `transformers`. Best for single-user experimentation."""
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer, StaticCache
+    from transformers.utils import is_flash_attn_2_available
+
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    model = AutoModelForCausalLM.from_pretrained(
+        model_id,
+        torch_dtype=select_dtype(),
+        device_map="auto",
+        # FlashAttention-2 is used when the optional `flash-attn` package is installed
+        attn_implementation="flash_attention_2" if is_flash_attn_2_available() else "sdpa",
+    )
+
+    if torch.cuda.is_available():
+        model.forward = torch.compile(model.forward, mode="reduce-overhead", fullgraph=True)
+
+    # Run the system prompt through the model once to fill a KV cache. A static cache
+    # keeps tensor shapes fixed between decode steps, so the compiled forward pass can
+    # be reused instead of recompiling for every token.
+    prefix_ids = tokenizer(PROMPT_PREFIX, return_tensors="pt").input_ids.to(model.device)
+    prefix_cache = StaticCache(
+        config=model.config, max_batch_size=1, max_cache_len=MAX_CACHE_LEN, device=model.device, dtype=model.dtype
+    )
+    with torch.no_grad():
+        prefix_cache = model(prefix_ids, past_key_values=prefix_cache, use_cache=True).past_key_values
+
+    def generate(prompt: str) -> Iterator[str]:
+        # Only the user's turn is tokenized; generation skips the already-cached prefix
+        user_ids = tokenizer(prompt + PROMPT_SUFFIX, add_special_tokens=False, return_tensors="pt").input_ids
+        # The static cache has a fixed size, so the prompt must leave room for the prefix and
+        # the response. Long prompts are truncated from the start, keeping the [/INST] suffix.
+        max_user_tokens = MAX_CACHE_LEN - prefix_ids.shape[1] - MAX_NEW_TOKENS
+        if user_ids.shape[1] > max_user_tokens:
+            print(f"(prompt truncated to its last {max_user_tokens} tokens) ", end="", flush=True)
+            user_ids = user_ids[:, -max_user_tokens:]
+        input_ids = torch.cat([prefix_ids, user_ids.to(model.device)], dim=-1)
+        with torch.inference_mode():
+            output_ids = model.generate(
+                input_ids=input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                # Generation writes into the cache, so each request gets its own copy
+                past_key_values=copy.deepcopy(prefix_cache),
+                do_sample=True,
+                top_k=TOP_K,
+                num_return_sequences=1,
+                eos_token_id=tokenizer.eos_token_id,
+                max_new_tokens=MAX_NEW_TOKENS,
+            )
+        new_tokens = output_ids[0][input_ids.shape[1]:]
+        yield tokenizer.decode(new_tokens, skip_special_tokens=True)
+
+    return generate
+
+def load_vllm_engine(model_id: str) -> Generator:
+    """
+    Loads the model into an in-process vLLM engine.
+
+    vLLM stores the KV cache in pages (PagedAttention) and batches requests
+    continuously, which gives much higher throughput than plain `transformers`.
+    Prefix caching lets prompts that share a prefix reuse its KV cache.
+    """
+    from vllm import LLM, SamplingParams
+
+    # Same dtype choice as the transformers backend, so GPUs without bfloat16 use float16
+    llm = LLM(model=model_id, dtype=select_dtype(), enable_prefix_caching=True, max_num_seqs=32)
+    sampling_params = SamplingParams(top_k=TOP_K, max_tokens=MAX_NEW_TOKENS)
+
+    def generate(prompt: str) -> Iterator[str]:
+        outputs = llm.generate([PROMPT_PREFIX + prompt + PROMPT_SUFFIX], sampling_params)
+        yield outputs[0].outputs[0].text
+
+    return generate
+
+def connect_vllm_server(base_url: str, model_id: str) -> Generator:
+    """
+    Connects to a running vLLM (or TGI) server through its OpenAI-compatible API.
+
+    This is the recommended setup when several users share one GPU, because the
+    server batches all of their requests together. Start it with, for example:
+    `vllm serve meta-llama/Llama-2-7b-chat-hf --enable-prefix-caching`
+    """
+    from openai import OpenAI
+
+    client = OpenAI(base_url=base_url, api_key=os.getenv("VLLM_API_KEY", "EMPTY"))
+
+    def generate(prompt: str) -> Iterator[str]:
+        stream = client.completions.create(
+            model=model_id,
+            prompt=PROMPT_PREFIX + prompt + PROMPT_SUFFIX,
+            max_tokens=MAX_NEW_TOKENS,
+            stream=True,
+            extra_body={"top_k": TOP_K},
         )
-        print(f"\n🤖 Assistant: {sequences[0]['generated_text']}")
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].text:
+                yield chunk.choices[0].text
+
+    return generate
 
 if __name__ == "__main__":
     main()
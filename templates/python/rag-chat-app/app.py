@@ -1,14 +1,47 @@
+from __future__ import annotations
+
 import os
+import asyncio
+import hashlib
+import functools
 import numpy as np
-from openai import AzureOpenAI
+import tiktoken
+import httpx
+from openai import AsyncAzureOpenAI
 from dotenv import load_dotenv
-from sklearn.metrics.pairwise import cosine_similarity
+from prompt_toolkit import PromptSession
+from embedding_cache import EmbeddingCache
+from llm_cache import SemanticCache
 
 # --- Configuration and Constants ---
 KNOWLEDGE_BASE_FILE = "data.md"
 TOP_K_RESULTS = 3
+# Knowledge bases at least this large use the parallel Numba kernel for retrieval (if installed)
+NUMBA_MIN_CHUNKS = 10_000
+# Tokenizer used by text-embedding-ada-002 and the GPT-3.5/GPT-4 chat models
+TOKEN_ENCODING = "cl100k_base"
+TEMPERATURE = 0.2
+# Per-request limits for the embeddings API, and how many requests may be in flight at once
+EMBEDDING_BATCH_SIZE = 96
+EMBEDDING_BATCH_MAX_TOKENS = 8000
+EMBEDDING_MAX_CONCURRENCY = 8
+EMBEDDING_CACHE_FILE = ".cache/embeddings.npz"
+RESPONSE_CACHE_FILE = ".cache/llm_cache.sqlite3"
+# How long typing must pause before the partial question is embedded in the background
+PREFETCH_DEBOUNCE_SECONDS = 0.4
+# Embedding batches, prefetches and chat calls share one keep-alive connection pool (HTTP/2);
+# HTTP/2 lets concurrent requests use the same connection, and up to 100 connections are kept open
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=100)
+
+# The system prompt never changes between requests, so it forms a stable prefix that the
+# service's automatic prompt caching can reuse. Per-request context goes in its own message.
+STATIC_SYSTEM_PROMPT = (
+    "You are a helpful AI assistant for the VibeCode platform. "
+    "Answer the user's question based *only* on the provided context. "
+    "If the context does not contain the answer, say that you don't know."
+)
 
-def main():
+async def main():
     """
     A Retrieval Augmented Generation (RAG) application that answers questions
     based on a local knowledge base.
@@ -25,10 +58,11 @@ def main():
         return
 
     try:
-        client = AzureOpenAI(
+        client = AsyncAzureOpenAI(
             api_key=api_key,
             api_version="2024-02-01",
-            azure_endpoint=azure_endpoint
+            azure_endpoint=azure_endpoint,
+            http_client=httpx.AsyncClient(http2=True, limits=HTTP_LIMITS)
         )
         print("✅ Azure OpenAI client initialized.")
     except Exception as e:
@@ -41,7 +75,11 @@ def main():
         print(f"✅ Knowledge base '{KNOWLEDGE_BASE_FILE}' loaded and chunked.")
         
         print("Creating embeddings for knowledge base... This may take a moment.")
-        embeddings = get_embeddings(client, embeddings_deployment, text_chunks)
+        cache = EmbeddingCache(EMBEDDING_CACHE_FILE)
+        embeddings = await get_embeddings(client, embeddings_deployment, text_chunks, cache=cache)
+        # Normalize once up front so each query only needs a single dot product per chunk
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
         print("✅ Embeddings created successfully.")
 
     except FileNotFoundError:
@@ -51,80 +89,253 @@ def main():
         print(f"Error processing knowledge base: {e}")
         return
 
+    response_cache = SemanticCache(RESPONSE_CACHE_FILE)
+
     # --- 3. Main Application Loop ---
     print("\n🚀 Ask questions about the VibeCode platform.")
     print("   Type 'exit' to end the application.")
     print("-----------------------------------------")
 
+    # Reads input without blocking the event loop, so the question can be embedded
+    # in the background while it is still being typed
+    session = PromptSession()
+    prefetcher = QueryPrefetcher(client, embeddings_deployment)
+    session.default_buffer.on_text_changed += prefetcher.on_text_changed
+
     while True:
-        query = input("\nYour question: ")
+        query = await session.prompt_async("\nYour question: ")
         if query.lower() == 'exit':
             print("\nExiting application. Goodbye!")
+            prefetcher.cancel()
+            await client.close()
             break
 
         try:
-            # 1. Retrieve relevant context
-            context = retrieve_context(client, embeddings_deployment, query, embeddings, text_chunks)
-            
-            # 2. Generate a response
-            response = generate_response(client, chat_deployment, query, context)
+            # 1. Embed the question (usually already done while it was typed)
+            query_embedding = await prefetcher.embedding_for(query)
+
+            # 2. Retrieve relevant context
+            context = retrieve_context(query_embedding, embeddings, text_chunks)
             
-            print(f"\n🤖 Answer: {response}")
+            # 3. Generate a response (or reuse the cached answer to a similar question)
+            print("\n🤖 Answer: ", end="", flush=True)
+            await generate_response(client, chat_deployment, query, context, response_cache, query_embedding)
+            print()
 
         except Exception as e:
             print(f"An error occurred: {e}")
 
 # --- Core RAG Functions ---
 
-def load_and_chunk_knowledge_base(file_path: str, chunk_size: int = 500) -> list[str]:
-    """Loads text from a file and splits it into smaller chunks."""
+def load_and_chunk_knowledge_base(file_path: str, chunk_size: int = 400, overlap: int = 50) -> list[str]:
+    """
+    Loads text from a file and splits it into smaller chunks.
+
+    Chunks are cut on token boundaries and overlap slightly, so text that spans a
+    boundary is still retrievable. Duplicate chunks are dropped so each unique
+    piece of text is only embedded once.
+    """
     with open(file_path, 'r', encoding='utf-8') as f:
         text = f.read()
-    
-    chunks = [text[i:i+chunk_size] for i in range(0, len(text), chunk_size)]
-    return chunks
 
-def get_embeddings(client, model, texts: list[str]) -> np.ndarray:
-    """Generates embeddings for a list of texts."""
-    response = client.embeddings.create(input=texts, model=model)
-    return np.array([item.embedding for item in response.data])
+    encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+    tokens = encoding.encode(text)
+    step = chunk_size - overlap
+    chunks = [
+        encoding.decode(tokens[i:i + chunk_size])
+        for i in range(0, max(len(tokens) - overlap, 1), step)
+    ]
+
+    seen = set()
+    unique_chunks = []
+    for chunk in chunks:
+        digest = hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+        if chunk.strip() and digest not in seen:
+            seen.add(digest)
+            unique_chunks.append(chunk)
+    return unique_chunks
+
+async def get_embeddings(client, model, texts: list[str], cache: EmbeddingCache | None = None) -> np.ndarray:
+    """
+    Generates embeddings for a list of texts.
+
+    If a cache is given, only the texts that are not already cached are sent to
+    the embeddings API, and the new results are saved.
+    """
+    if cache is None:
+        return await embed_in_batches(client, model, texts)
+
+    keys = [cache.key(model, text) for text in texts]
+    vectors = [cache.get(key) for key in keys]
+    missing_idx = [i for i, vector in enumerate(vectors) if vector is None]
+
+    if missing_idx:
+        new_vectors = await embed_in_batches(client, model, [texts[i] for i in missing_idx])
+        for i, vector in zip(missing_idx, new_vectors):
+            vectors[i] = vector
+            cache.set(keys[i], vector)
+        cache.save()
+
+    return np.array(vectors, dtype=np.float32)
+
+async def embed_in_batches(client, model, texts: list[str], max_concurrency: int = EMBEDDING_MAX_CONCURRENCY) -> np.ndarray:
+    """Embeds texts in API-sized batches, sending up to `max_concurrency` batches at once."""
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def embed_batch(batch: list[str]) -> np.ndarray:
+        async with semaphore:
+            response = await client.embeddings.create(input=batch, model=model)
+            return np.array([item.embedding for item in response.data], dtype=np.float32)
+
+    results = await asyncio.gather(*[embed_batch(batch) for batch in batch_texts(texts)])
+    return np.vstack(results)
+
+def batch_texts(texts: list[str], batch_size: int = EMBEDDING_BATCH_SIZE, max_tokens: int = EMBEDDING_BATCH_MAX_TOKENS) -> list[list[str]]:
+    """Groups texts into batches that stay under the embeddings API's per-request limits."""
+    encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+    batches, batch, batch_tokens = [], [], 0
+    for text in texts:
+        n_tokens = len(encoding.encode(text))
+        if batch and (len(batch) >= batch_size or batch_tokens + n_tokens > max_tokens):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(text)
+        batch_tokens += n_tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+async def embed_query(client, model, query: str) -> np.ndarray:
+    """Generates a normalized embedding for the user's question."""
+    query_embedding = (await get_embeddings(client, model, [query]))[0]
+    return query_embedding / np.linalg.norm(query_embedding)
 
-def retrieve_context(client, model, query: str, embeddings: np.ndarray, chunks: list[str]) -> str:
+class QueryPrefetcher:
+    """
+    Embeds the question in the background while the user is typing it.
+
+    Each keystroke restarts a short debounce timer. Once typing pauses, the
+    current text is embedded, so by the time the question is submitted its
+    embedding is often already available (or on its way).
+    """
+    def __init__(self, client, model, debounce_seconds: float = PREFETCH_DEBOUNCE_SECONDS):
+        self.client = client
+        self.model = model
+        self.debounce_seconds = debounce_seconds
+        self._text = None
+        self._task = None
+        self._started = False
+
+    def on_text_changed(self, buffer) -> None:
+        """prompt_toolkit callback, called after every edit of the input line."""
+        self.cancel()
+        text = buffer.text.strip()
+        if text and text.lower() != "exit":
+            self._text = text
+            self._started = False
+            self._task = asyncio.create_task(self._prefetch(text))
+
+    async def _prefetch(self, text: str) -> np.ndarray | None:
+        await asyncio.sleep(self.debounce_seconds)
+        self._started = True
+        try:
+            return await embed_query(self.client, self.model, text)
+        except Exception:
+            # A failed prefetch is not an error; the question is embedded again on submit
+            return None
+
+    def cancel(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+        self._text, self._task = None, None
+
+    async def embedding_for(self, query: str) -> np.ndarray:
+        """Returns the embedding for the submitted question, reusing the prefetch if it matches."""
+        text, task, started = self._text, self._task, self._started
+        self._text, self._task = None, None
+        # Only wait on a prefetch for this exact text that is already past its debounce delay
+        if task is not None and started and text == query.strip():
+            try:
+                embedding = await task
+            except asyncio.CancelledError:
+                embedding = None
+            if embedding is not None:
+                return embedding
+        elif task is not None:
+            task.cancel()
+        return await embed_query(self.client, self.model, query)
+
+@functools.lru_cache(maxsize=None)
+def load_topk_kernel():
+    """Imports the Numba top-k kernel, or returns None if Numba is not installed."""
+    try:
+        from topk_kernel import topk_cosine
+    except ImportError:
+        return None
+    return topk_cosine
+
+def retrieve_context(query_embedding: np.ndarray, embeddings: np.ndarray, chunks: list[str]) -> str:
     """Retrieves the most relevant text chunks from the knowledge base."""
-    query_embedding = get_embeddings(client, model, [query])
-    
-    # Calculate cosine similarity
-    sims = cosine_similarity(query_embedding, embeddings)[0]
-    
-    # Get top_k results
-    top_indices = sims.argsort()[-TOP_K_RESULTS:][::-1]
+    k = min(TOP_K_RESULTS, len(embeddings))
+    topk_cosine = load_topk_kernel() if len(embeddings) >= NUMBA_MIN_CHUNKS else None
+
+    if topk_cosine is not None:
+        # Large knowledge base: score and select the top k in one parallel pass
+        top_indices = topk_cosine(embeddings, query_embedding.astype(np.float32), k)
+    else:
+        # The knowledge base embeddings are already normalized, so cosine similarity
+        # is just a single matrix-vector product
+        sims = embeddings @ query_embedding
+        top_indices = np.argpartition(-sims, k - 1)[:k]
+
+    # Keep the top_k results in document order rather than by score, so the same
+    # set of chunks always produces an identical context block.
+    top_indices = np.sort(top_indices)
     
     # Concatenate the relevant chunks into a single context string
     context = "\n\n---\n\n".join([chunks[i] for i in top_indices])
     return context
 
-def generate_response(client, model, query: str, context: str) -> str:
-    """Generates a response using the chat model based on the query and context."""
-    system_prompt = (
-        "You are a helpful AI assistant for the VibeCode platform. "
-        "Answer the user's question based *only* on the provided context. "
-        "If the context does not contain the answer, say that you don't know."
-    )
+async def generate_response(client, model, query: str, context: str, cache: SemanticCache, query_embedding: np.ndarray) -> str:
+    """
+    Generates a response using the chat model based on the query and context.
 
-    user_prompt = (
-        f"Context:\n{context}\n\n---\n\nQuestion: {query}\n\nAnswer:"
-    )
+    The response is printed as it is streamed from the model, and the full text is returned.
+    """
+    context_prompt = f"Context:\n{context}"
+    # Cached answers are scoped to the exact retrieved context, so both exact and similar
+    # question matches miss once the knowledge base changes
+    context_digest = hashlib.sha256(context_prompt.encode("utf-8")).hexdigest()
+    cache_scope = f"{STATIC_SYSTEM_PROMPT}\n\ncontext:{context_digest}"
+
+    cached = cache.get(query, cache_scope, TEMPERATURE, embedding=query_embedding)
+    if cached is not None:
+        print(cached, end="", flush=True)
+        return cached
 
-    response = client.chat.completions.create(
+    response = await client.chat.completions.create(
         model=model,
         messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
+            {"role": "system", "content": STATIC_SYSTEM_PROMPT},
+            {"role": "user", "content": context_prompt},
+            {"role": "assistant", "content": "Understood."},
+            {"role": "user", "content": query}
         ],
-        temperature=0.2,
-        max_tokens=250
+        temperature=TEMPERATURE,
+        max_tokens=250,
+        stream=True
     )
-    return response.choices[0].message.content
+
+    buf = []
+    async for chunk in response:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            print(delta, end="", flush=True)
+            buf.append(delta)
+
+    answer = "".join(buf)
+    cache.set(query, cache_scope, TEMPERATURE, answer, embedding=query_embedding)
+    return answer
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import time
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    A small on-disk cache for knowledge base embeddings.
+
+    Embeddings are deterministic for a given model and input text, so there is no
+    need to pay for them again every time the application starts. Each entry is
+    keyed by a SHA-256 hash of the embeddings deployment name and the chunk text,
+    and all entries are stored together in a single NumPy `.npz` file.
+    """
+
+    def __init__(self, path: str = ".cache/embeddings.npz", ttl_seconds: float | None = None, disabled: bool = False):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.disabled = disabled
+        self._vectors: dict[str, np.ndarray] = {}
+        self._created: dict[str, float] = {}
+        self._dirty = False
+
+        if not self.disabled:
+            self._load()
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        """Builds the cache key for a piece of text embedded with the given model."""
+        return hashlib.sha256(f"{model}|{text}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> np.ndarray | None:
+        """Returns the cached embedding for a key, or None if it is missing or expired."""
+        if self.disabled or key not in self._vectors:
+            return None
+        if self.ttl_seconds is not None and time.time() - self._created[key] > self.ttl_seconds:
+            return None
+        return self._vectors[key]
+
+    def set(self, key: str, vector: np.ndarray):
+        """Stores an embedding in memory. Call `save()` to persist it to disk."""
+        if self.disabled:
+            return
+        self._vectors[key] = np.asarray(vector, dtype=np.float32)
+        self._created[key] = time.time()
+        self._dirty = True
+
+    def save(self):
+        """Atomically writes the cache to disk if anything has changed."""
+        if self.disabled or not self._dirty:
+            return
+
+        keys = list(self._vectors)
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+
+        # Write to a temporary file first so a crash never leaves a half-written cache behind.
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    keys=np.array(keys),
+                    vectors=np.stack([self._vectors[k] for k in keys]),
+                    created=np.array([self._created[k] for k in keys], dtype=np.float64),
+                )
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self._dirty = False
+
+    def _load(self):
+        """Loads previously cached embeddings, dropping any that have expired."""
+        if not os.path.exists(self.path):
+            return
+
+        now = time.time()
+        with np.load(self.path) as data:
+            for key, vector, created in zip(data["keys"], data["vectors"], data["created"]):
+                if self.ttl_seconds is not None and now - created > self.ttl_seconds:
+                    continue
+                self._vectors[str(key)] = vector
+                self._created[str(key)] = float(created)
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+
+class SemanticCache:
+    """
+    A prompt/response cache for chat completions.
+
+    Lookups first try an exact match on a hash of the system prompt and query. If that
+    misses and a query embedding is provided, the cached query with the highest cosine
+    similarity (for the same system prompt) is used instead, as long as it is above
+    `threshold`. Only low-temperature requests are cached, because higher temperatures
+    are meant to produce varied answers.
+    """
+
+    def __init__(
+        self,
+        path: str = ".cache/llm_cache.sqlite3",
+        threshold: float = 0.95,
+        max_temperature: float = 0.2,
+        ttl_seconds: float | None = None,
+        disabled: bool = False,
+    ):
+        self.threshold = threshold
+        self.max_temperature = max_temperature
+        self.ttl_seconds = ttl_seconds
+        self.disabled = disabled
+        # Per system prompt: (normalized query embeddings, responses, creation times)
+        self._vectors: dict[str, tuple[np.ndarray, list[str], list[float]]] = {}
+
+        if self.disabled:
+            return
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, system_key TEXT, response TEXT, embedding BLOB, created REAL)"
+        )
+        self._load_vectors()
+
+    def get(self, query: str, system_prompt: str, temperature: float, embedding: np.ndarray | None = None) -> str | None:
+        """Returns a cached response for the query, or None on a cache miss."""
+        if not self._enabled_for(temperature):
+            return None
+
+        row = self._db.execute(
+            "SELECT response, created FROM responses WHERE key = ?",
+            (self._key(system_prompt, query),),
+        ).fetchone()
+        if row and not self._expired(row[1]):
+            return row[0]
+
+        if embedding is None:
+            return None
+        return self._get_similar(self._hash(system_prompt), embedding)
+
+    def set(self, query: str, system_prompt: str, temperature: float, response: str, embedding: np.ndarray | None = None):
+        """Stores a response for the query."""
+        if not self._enabled_for(temperature) or not response:
+            return
+
+        system_key = self._hash(system_prompt)
+        now = time.time()
+        vector = None
+        if embedding is not None:
+            vector = np.asarray(embedding, dtype=np.float32)
+            vector = vector / np.linalg.norm(vector)
+
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, system_key, response, embedding, created) VALUES (?, ?, ?, ?, ?)",
+                (self._key(system_prompt, query), system_key, response, vector.tobytes() if vector is not None else None, now),
+            )
+
+        if vector is not None:
+            matrix, responses, created = self._vectors.get(system_key, (np.empty((0, vector.size), dtype=np.float32), [], []))
+            self._vectors[system_key] = (np.vstack([matrix, vector]), responses + [response], created + [now])
+
+    def _enabled_for(self, temperature: float) -> bool:
+        return not self.disabled and temperature <= self.max_temperature
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created > self.ttl_seconds
+
+    def _get_similar(self, system_key: str, embedding: np.ndarray) -> str | None:
+        """Finds the most similar cached query with a single matrix-vector product."""
+        if system_key not in self._vectors:
+            return None
+
+        matrix, responses, created = self._vectors[system_key]
+        query = np.asarray(embedding, dtype=np.float32)
+        sims = matrix @ (query / np.linalg.norm(query))
+        best = int(np.argmax(sims))
+        if sims[best] < self.threshold or self._expired(created[best]):
+            return None
+        return responses[best]
+
+    def _load_vectors(self):
+        rows = self._db.execute(
+            "SELECT system_key, response, embedding, created FROM responses WHERE embedding IS NOT NULL ORDER BY created"
+        )
+        grouped: dict[str, tuple[list[np.ndarray], list[str], list[float]]] = {}
+        for system_key, response, embedding, created in rows:
+            vectors, responses, times = grouped.setdefault(system_key, ([], [], []))
+            vectors.append(np.frombuffer(embedding, dtype=np.float32))
+            responses.append(response)
+            times.append(created)
+
+        for system_key, (vectors, responses, times) in grouped.items():
+            self._vectors[system_key] = (np.vstack(vectors), responses, times)
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def _key(cls, system_prompt: str, query: str) -> str:
+        return cls._hash(f"{system_prompt}\x00{query}")
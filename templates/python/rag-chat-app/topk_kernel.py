@@ -0,0 +1,38 @@
+import numpy as np
+from numba import njit, prange
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def topk_cosine(embeddings: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    """
+    Returns the indices of the `k` rows of `embeddings` most similar to `query`, best first.
+
+    Both inputs must already be L2-normalized, contiguous float32 arrays, so the dot
+    product is the cosine similarity. The dot products are computed in parallel across
+    CPU cores, then a single pass keeps a small sorted list of the best `k` rows, which
+    avoids sorting all of the scores.
+    """
+    n, d = embeddings.shape
+    sims = np.empty(n, dtype=np.float32)
+    for i in prange(n):
+        s = np.float32(0.0)
+        for j in range(d):
+            s += embeddings[i, j] * query[j]
+        sims[i] = s
+
+    k = min(k, n)
+    top_idx = np.full(k, -1, dtype=np.int64)
+    # Below any cosine similarity. Not -inf: fastmath lets LLVM assume no value is infinite.
+    top_sim = np.full(k, -2.0, dtype=np.float32)
+    for i in range(n):
+        s = sims[i]
+        if s > top_sim[k - 1]:
+            # Insertion into the sorted top-k list
+            pos = k - 1
+            while pos > 0 and top_sim[pos - 1] < s:
+                top_sim[pos] = top_sim[pos - 1]
+                top_idx[pos] = top_idx[pos - 1]
+                pos -= 1
+            top_sim[pos] = s
+            top_idx[pos] = i
+    return top_idx
@@ -1,28 +1,45 @@
+from __future__ import annotations
+
 import os
+import re
+import html
 import asyncio
+import subprocess
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 import semantic_kernel as sk
 from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion, AzureTextEmbedding, OpenAIChatCompletion, OpenAITextEmbedding
 from semantic_kernel.connectors.memory.chroma import ChromaMemoryStore
 from semantic_kernel.text import split_markdown_lines
 from semantic_kernel.memory import SemanticTextMemory
 from dotenv import load_dotenv
-import git
+from prompt_toolkit import PromptSession
 import markdown
-from bs4 import BeautifulSoup
 
 # --- Configuration & Constants ---
 REPO_URL = "https://github.com/microsoft/Web-Dev-For-Beginners.git"
 REPO_PATH = "./web-dev-for-beginners"
+# The only part of the repository that is ingested
+LESSONS_DIR = "2-js-basics/lessons"
 COLLECTION_NAME = "web_dev_for_beginners"
+# Matches HTML tags, to turn rendered Markdown into plain text
+_TAG_RE = re.compile(r"<[^>]+>")
+# Number of chunks embedded with a single embeddings API request during ingestion
+EMBEDDING_BATCH_SIZE = 64
+# Number of batches being embedded at the same time, and how many parsed chunks may wait for them
+EMBEDDING_WORKERS = 4
+INGEST_QUEUE_SIZE = 256
+# Number of recent questions whose search results are kept, so repeated questions skip the embeddings API
+SEARCH_CACHE_SIZE = 1024
 
 # --- Main Application Logic ---
 async def main():
     """Main function to run the Semantic Kernel RAG application."""
     # 1. Initialize Semantic Kernel
-    kernel, memory = await initialize_kernel_and_memory()
+    kernel, memory, memory_store, embedding_generator = await initialize_kernel_and_memory()
 
     # 2. Ingest and Process Data
-    await ingest_data(memory)
+    await ingest_data(memory_store, embedding_generator)
 
     # 3. Start Interactive Q&A Loop
     await interactive_qa_loop(kernel, memory)
@@ -52,13 +69,14 @@ async def initialize_kernel_and_memory():
     memory = SemanticTextMemory(storage=memory_store, embeddings_generator=embedding_generator)
     
     print("✅ Kernel and memory initialized.")
-    return kernel, memory
+    # The store and embedding generator are also returned, so ingestion can embed and save in batches
+    return kernel, memory, memory_store, embedding_generator
 
-async def ingest_data(memory):
+async def ingest_data(memory_store: ChromaMemoryStore, embedding_generator):
     """Clones the repo, processes the markdown files, and stores them in memory."""
     # Check if data is already ingested
     try:
-        collections = await memory.get_collections_async()
+        collections = await memory_store.get_collections_async()
         if COLLECTION_NAME in collections:
             print("📚 Data already ingested. Skipping ingestion.")
             return
@@ -67,35 +85,94 @@ async def ingest_data(memory):
 
     print(f"\n📥 Cloning repository: {REPO_URL}")
     if not os.path.exists(REPO_PATH):
-        git.Repo.clone_from(REPO_URL, REPO_PATH)
+        # Shallow, partial clone that only checks out the lessons that are ingested
+        subprocess.check_call(["git", "clone", "--depth", "1", "--filter=blob:none", "--sparse", REPO_URL, REPO_PATH])
+        subprocess.check_call(["git", "-C", REPO_PATH, "sparse-checkout", "set", LESSONS_DIR])
     print("✅ Repository cloned.")
 
     print("\n📄 Processing and embedding Markdown files...")
-    # Walk through the lesson directories
-    lessons_path = os.path.join(REPO_PATH, '2-js-basics', 'lessons')
-    file_count = 0
-    for root, _, files in os.walk(lessons_path):
-        for file in files:
-            if file.endswith(".md"):
-                file_path = os.path.join(root, file)
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    # Convert markdown to plain text for cleaner chunks
-                    html = markdown.markdown(content)
-                    soup = BeautifulSoup(html, 'html.parser')
-                    text_content = soup.get_text()
-
-                    # Chunk the text
-                    chunks = split_markdown_lines(text_content, max_tokens=200, chunk_overlap=20)
-                    for i, chunk in enumerate(chunks):
-                        await memory.save_information_async(
-                            collection=COLLECTION_NAME,
-                            id=f"{file}_{i}",
-                            text=chunk
-                        )
-                file_count += 1
-                print(f"  - Processed {file}")
-    print(f"\n✅ Processed and embedded {file_count} files into ChromaDB.")
+    # Find the Markdown files in the lesson directories
+    lessons_path = os.path.join(REPO_PATH, LESSONS_DIR)
+    paths = [
+        os.path.join(root, file)
+        for root, _, files in os.walk(lessons_path)
+        for file in files
+        if file.endswith(".md")
+    ]
+
+    if not await memory_store.does_collection_exist_async(COLLECTION_NAME):
+        await memory_store.create_collection_async(COLLECTION_NAME)
+    # Look the collection up once, instead of once per saved record
+    collection = await memory_store.get_collection_async(COLLECTION_NAME)
+    # Parsed (id, text) chunks wait here until an embedding worker picks them up
+    queue = asyncio.Queue(maxsize=INGEST_QUEUE_SIZE)
+
+    async def produce():
+        # Parsing is CPU-bound, so files are parsed in parallel worker processes
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor() as pool:
+            parse_tasks = [loop.run_in_executor(pool, parse_file, path) for path in paths]
+            for path, parse_task in zip(paths, parse_tasks):
+                for chunk in await parse_task:
+                    await queue.put(chunk)
+                print(f"  - Processed {os.path.relpath(path, lessons_path)}")
+        # One end-of-input marker per worker
+        for _ in range(EMBEDDING_WORKERS):
+            await queue.put(None)
+
+    async def consume():
+        # Each worker fills a batch, then embeds and saves it while parsing carries on
+        batch = []
+        while (chunk := await queue.get()) is not None:
+            batch.append(chunk)
+            if len(batch) == EMBEDDING_BATCH_SIZE:
+                await save_batch(collection, embedding_generator, batch)
+                batch = []
+        if batch:
+            await save_batch(collection, embedding_generator, batch)
+
+    tasks = [asyncio.create_task(produce())] + [asyncio.create_task(consume()) for _ in range(EMBEDDING_WORKERS)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # Don't leave the other tasks blocked on the queue if one of them fails
+        for task in tasks:
+            task.cancel()
+        raise
+    print(f"\n✅ Processed and embedded {len(paths)} files into ChromaDB.")
+
+def parse_file(path: str) -> list[tuple[str, str]]:
+    """Converts a Markdown file to plain text and splits it into (id, text) chunks."""
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    # Convert markdown to plain text for cleaner chunks. Stripping the tags directly is
+    # much cheaper than building a parse tree; line breaks are kept for the chunker.
+    text_content = html.unescape(_TAG_RE.sub("", markdown.markdown(content)))
+
+    # Chunk the text. Most lessons have a README.md, so the id uses the path within the repo.
+    chunks = split_markdown_lines(text_content, max_tokens=200, chunk_overlap=20)
+    file_id = os.path.relpath(path, REPO_PATH)
+    return [(f"{file_id}_{i}", chunk) for i, chunk in enumerate(chunks)]
+
+async def save_batch(collection, embedding_generator, batch: list[tuple[str, str]]):
+    """Embeds a batch of (id, text) chunks with a single API request and saves them with a single write."""
+    ids = [id for id, _ in batch]
+    texts = [text for _, text in batch]
+    embeddings = await embedding_generator.generate_embeddings_async(texts)
+    # The same metadata that ChromaMemoryStore writes, so the chunks can be searched through SemanticTextMemory
+    metadatas = [
+        {
+            "timestamp": "",
+            "is_reference": "False",
+            "external_source_name": "",
+            "description": "",
+            "additional_metadata": "",
+            "id": id,
+        }
+        for id in ids
+    ]
+    collection.add(ids=ids, embeddings=embeddings.tolist(), documents=texts, metadatas=metadatas)
 
 async def interactive_qa_loop(kernel: sk.Kernel, memory: SemanticTextMemory):
     """Runs the main interactive question-and-answering loop."""
@@ -121,17 +198,21 @@ async def interactive_qa_loop(kernel: sk.Kernel, memory: SemanticTextMemory):
     print("   Ask me a question, or type 'exit' to end.")
     print("----------------------------------------------------------------")
 
+    # Reads input without blocking the event loop
+    session = PromptSession()
+    # Recent search results, least recently used first
+    search_cache = OrderedDict()
+
     while True:
         try:
-            user_question = input("\nYour question: ")
+            user_question = await session.prompt_async("\nYour question: ")
             if user_question.lower() == 'exit':
                 print("\nExiting application. Goodbye!")
                 break
 
             print("\n🔍 Searching for relevant information...")
             # Search for relevant context
-            results = await memory.search_async(COLLECTION_NAME, user_question, limit=3, min_relevance_score=0.75)
-            context = "\n".join([r.text for r in results])
+            context = await search_context(memory, user_question, search_cache)
 
             if not context:
                 print("\n🤖 Assistant: I could not find any relevant information in the course materials to answer your question.")
@@ -151,5 +232,26 @@ async def interactive_qa_loop(kernel: sk.Kernel, memory: SemanticTextMemory):
         except Exception as e:
             print(f"An error occurred: {e}")
 
+async def search_context(memory: SemanticTextMemory, question: str, cache: OrderedDict) -> str:
+    """
+    Returns the course text most relevant to a question.
+
+    The collection does not change after ingestion, so the result for a question
+    that was already asked (ignoring case and surrounding spaces) is reused instead
+    of embedding the question and searching again.
+    """
+    key = question.strip().lower()
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+
+    results = await memory.search_async(COLLECTION_NAME, question, limit=3, min_relevance_score=0.75)
+    context = "\n".join([r.text for r in results])
+
+    cache[key] = context
+    if len(cache) > SEARCH_CACHE_SIZE:
+        cache.popitem(last=False)
+    return context
+
 if __name__ == "__main__":
     asyncio.run(main())
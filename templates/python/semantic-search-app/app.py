@@ -1,19 +1,35 @@
+from __future__ import annotations
+
 import os
-import pandas as pd
+import asyncio
+import functools
+from collections import OrderedDict
+from typing import NamedTuple
+import httpx
 import numpy as np
-from openai import AzureOpenAI
+import pyarrow as pa
+import pyarrow.parquet as pq
+import faiss
+from openai import AsyncAzureOpenAI
 from dotenv import load_dotenv
+from prompt_toolkit import PromptSession
+from build_index import INDEX_FILE, METADATA_FILE, INDEX_ADD_BATCH_SIZE
 
 # --- Configuration and Constants ---
 SIMILARITIES_RESULTS_THRESHOLD = 0.75
-DATASET_NAME = "embedding_index_3m.json"
-
-def main():
+# How many of the closest clusters an IVF index scans per query (large catalogs only)
+IVF_NPROBE = 16
+# Number of recent query embeddings kept, so repeated searches skip the embeddings API
+QUERY_CACHE_SIZE = 1024
+# Query embeddings are requested over one shared keep-alive connection pool (HTTP/2)
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=100)
+
+async def main():
     """
     A semantic search application that finds relevant videos based on a user's query.
 
-    This script loads a pre-computed embeddings index, generates an embedding for the
-    user's query, and then uses cosine similarity to find the most relevant videos.
+    This script loads the FAISS index saved by `build_index.py`, generates an embedding for
+    the user's query, and then uses the index to find the most relevant videos by cosine similarity.
     """
     # --- 1. Initialization and Setup ---
     load_dotenv()
@@ -27,10 +43,11 @@ def main():
         return
 
     try:
-        client = AzureOpenAI(
+        client = AsyncAzureOpenAI(
             api_key=api_key,
             api_version="2024-02-01",
-            azure_endpoint=azure_endpoint
+            azure_endpoint=azure_endpoint,
+            http_client=httpx.AsyncClient(http2=True, limits=HTTP_LIMITS)
         )
         print("✅ Azure OpenAI client initialized successfully.")
     except Exception as e:
@@ -39,11 +56,11 @@ def main():
 
     # --- 2. Data Loading ---
     try:
-        pd_vectors = load_dataset(DATASET_NAME)
-        print(f"✅ Embeddings index '{DATASET_NAME}' loaded successfully.")
-    except FileNotFoundError:
-        print(f"Error: The data file '{DATASET_NAME}' was not found.")
-        print("Please make sure it is in the same directory as this script.")
+        dataset = load_dataset(INDEX_FILE, METADATA_FILE)
+        print(f"✅ Search index '{INDEX_FILE}' loaded successfully.")
+    except FileNotFoundError as e:
+        print(f"Error: The data file '{e.filename}' was not found.")
+        print("Please run `python build_index.py` first to build the search index.")
         return
 
     # --- 3. Main Application Loop ---
@@ -51,62 +68,122 @@ def main():
     print("   Type 'exit' to end the application.")
     print("-----------------------------------------")
 
+    # Reads input without blocking the event loop
+    session = PromptSession()
+    # Recent query embeddings, least recently used first
+    query_cache = OrderedDict()
+
     while True:
-        query = input("\nEnter a search query: ")
+        query = await session.prompt_async("\nEnter a search query: ")
         if query.lower() == 'exit':
             print("\nExiting application. Goodbye!")
+            await client.close()
             break
         
         try:
-            videos = get_similar_videos(client, embeddings_deployment, query, pd_vectors)
+            videos = await get_similar_videos(client, embeddings_deployment, query, dataset.metadata, dataset.index, query_cache)
             display_results(videos, query)
         except Exception as e:
             print(f"An error occurred during search: {e}")
 
 # --- Core Functions ---
 
-def load_dataset(source: str) -> pd.DataFrame:
-    """Loads the embeddings index from a JSON file into a pandas DataFrame."""
-    pd_vectors = pd.read_json(source)
-    return pd_vectors.drop(columns=["text"], errors="ignore").fillna("")
+class VideoDataset(NamedTuple):
+    """The video catalog: a FAISS index over the embeddings plus one column per metadata field."""
+    index: faiss.Index
+    metadata: pa.Table
 
-def get_similar_videos(client, model, query: str, dataset: pd.DataFrame, rows: int = 5) -> pd.DataFrame:
-    """Finds videos in the dataset that are most similar to the user's query."""
-    video_vectors = dataset.copy()
+def load_dataset(index_file: str, metadata_file: str) -> VideoDataset:
+    """
+    Loads the search index and video metadata written by `build_index.py`.
+
+    The index is opened with `IO_FLAG_MMAP`, so the inverted lists of a large IVF
+    index are memory-mapped rather than read, and only the clusters that get
+    searched are loaded. If FAISS was installed with GPU support and a GPU is
+    available, the index is moved to the GPU.
+    """
+    index = faiss.read_index(index_file, faiss.IO_FLAG_MMAP)
+    if isinstance(index, faiss.IndexIVF):
+        index.nprobe = IVF_NPROBE
+    if faiss.get_num_gpus() > 0:
+        index = index_to_gpu(index)
+    metadata = pq.read_table(metadata_file)
+    return VideoDataset(index, metadata)
+
+@functools.lru_cache(maxsize=None)
+def gpu_resources() -> "faiss.StandardGpuResources":
+    """Creates the GPU memory and stream resources once; they must outlive every GPU index."""
+    return faiss.StandardGpuResources()
+
+def index_to_gpu(index: faiss.Index) -> faiss.Index:
+    """Copies a CPU index to the first GPU, storing its vectors as float16."""
+    options = faiss.GpuClonerOptions()
+    options.useFloat16 = True
+    if not isinstance(index, faiss.IndexScalarQuantizer):
+        return faiss.index_cpu_to_gpu(gpu_resources(), 0, index, options)
+
+    # The GPU has no flat scalar-quantized index, but a flat index stored as float16 holds the same values
+    gpu_index = faiss.index_cpu_to_gpu(gpu_resources(), 0, faiss.IndexFlatIP(index.d), options)
+    for start in range(0, index.ntotal, INDEX_ADD_BATCH_SIZE):
+        gpu_index.add(index.reconstruct_n(start, min(INDEX_ADD_BATCH_SIZE, index.ntotal - start)))
+    return gpu_index
+
+async def embed_query(client, model, query: str, cache: OrderedDict) -> np.ndarray:
+    """
+    Returns the normalized (1, d) embedding of a query.
+
+    The embedding of a query that was already searched for (ignoring case and
+    surrounding spaces) is reused instead of calling the embeddings API again.
+    """
+    key = (model, query.strip().lower())
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
 
-    # 1. Get the embedding for the user's query
-    query_embeddings = client.embeddings.create(input=query, model=model).data[0].embedding
+    query_embedding = (await client.embeddings.create(input=query, model=model)).data[0].embedding
+    query_embedding = np.asarray([query_embedding], dtype=np.float32)
+    faiss.normalize_L2(query_embedding)
 
-    # 2. Calculate cosine similarity between the query and all video embeddings
-    video_vectors["similarity"] = video_vectors["ada_v2"].apply(
-        lambda x: cosine_similarity(np.array(query_embeddings), np.array(x))
-    )
+    cache[key] = query_embedding
+    if len(cache) > QUERY_CACHE_SIZE:
+        cache.popitem(last=False)
+    return query_embedding
 
-    # 3. Filter and sort the results
-    mask = video_vectors["similarity"] >= SIMILARITIES_RESULTS_THRESHOLD
-    video_vectors = video_vectors[mask].copy()
-    video_vectors = video_vectors.sort_values(by="similarity", ascending=False).head(rows)
+async def get_similar_videos(client, model, query: str, metadata: pa.Table, index: faiss.Index, cache: OrderedDict, rows: int = 5) -> list[dict]:
+    """Finds videos in the dataset that are most similar to the user's query."""
+    # 1. Get the normalized embedding for the user's query
+    query_embedding = await embed_query(client, model, query, cache)
 
-    return video_vectors
+    # 2. Search the index for the most similar videos (returned most similar first)
+    similarities, indices = index.search(query_embedding, rows)
+    similarities, indices = similarities[0], indices[0]
 
-def display_results(videos: pd.DataFrame, query: str):
+    # 3. Drop empty slots (-1) and matches below the threshold
+    mask = (indices >= 0) & (similarities >= SIMILARITIES_RESULTS_THRESHOLD)
+
+    # 4. Only the matching rows are turned into Python objects
+    videos = metadata.take(indices[mask]).to_pylist()
+    for video, similarity in zip(videos, similarities[mask]):
+        video["similarity"] = float(similarity)
+    return videos
+
+def display_results(videos: list[dict], query: str):
     """Prints the search results in a user-friendly format."""
-    if videos.empty:
+    if not videos:
         print(f"\nNo videos found similar to '{query}'. Try a different search term.")
         return
 
     print(f"\nVideos similar to '{query}':")
-    for _, row in videos.iterrows():
-        youtube_url = f"https://youtu.be/{row['videoId']}?t={row['seconds']}"
-        print(f"\n- {row['title']}")
-        print(f"  Summary: {' '.join(row['summary'].split()[:20])}...")
+    for video in videos:
+        # Any metadata field may be null if it was missing from the JSON index
+        youtube_url = f"https://youtu.be/{video['videoId']}"
+        if video['seconds'] is not None:
+            youtube_url += f"?t={video['seconds']}"
+        print(f"\n- {video['title'] or 'Untitled'}")
+        print(f"  Summary: {' '.join((video['summary'] or '').split()[:20])}...")
         print(f"  YouTube: {youtube_url}")
-        print(f"  Similarity: {row['similarity']:.4f}")
-        print(f"  Speakers: {row['speaker']}")
-
-def cosine_similarity(a, b):
-    """Calculates the cosine similarity between two vectors."""
-    return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+        print(f"  Similarity: {video['similarity']:.4f}")
+        print(f"  Speakers: {video['speaker'] or 'Unknown'}")
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
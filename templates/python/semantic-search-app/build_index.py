@@ -0,0 +1,92 @@
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import faiss
+
+# --- Configuration and Constants ---
+DATASET_NAME = "embedding_index_3m.json"
+# The embeddings as a float32 matrix, which the FAISS index is built from
+EMBEDDINGS_FILE = "ada_v2.npy"
+# Outputs read by app.py: the trained FAISS index, and everything else
+INDEX_FILE = "videos.faiss"
+METADATA_FILE = "metadata.parquet"
+METADATA_COLUMNS = ["videoId", "title", "summary", "seconds", "speaker"]
+# Catalogs at least this large use an approximate IVF index instead of a full scan
+IVF_MIN_VIDEOS = 100_000
+IVF_NLIST = 1024
+# The IVF clustering is trained on a random sample of this many videos
+IVF_TRAIN_SIZE = 64 * IVF_NLIST
+# Embeddings are copied into the index this many rows at a time
+INDEX_ADD_BATCH_SIZE = 100_000
+
+def main():
+    """
+    Converts the JSON embeddings index into files that load almost instantly.
+
+    Parsing the JSON creates a Python float for every value of every embedding,
+    which takes a long time for large indexes. This script does that once and
+    saves the L2-normalized embeddings as a contiguous float32 `.npy` file, builds
+    and trains the FAISS index from it, and saves the index and the remaining
+    columns as a Parquet file for app.py to load.
+
+    The JSON is streamed rather than loaded: a first pass counts the videos, and a
+    second pass writes each embedding straight into the `.npy` file on disk, so
+    the whole index never has to fit in memory.
+    """
+    # Imported here, since app.py imports this module for the file names above
+    import ijson
+
+    print(f"📖 Reading '{DATASET_NAME}'... This may take a while for large indexes.")
+    with open(DATASET_NAME, "rb") as f:
+        n = sum(1 for _ in ijson.items(f, "item"))
+        f.seek(0)
+        first = next(ijson.items(f, "item.ada_v2", use_float=True))
+
+    embeddings = np.lib.format.open_memmap(EMBEDDINGS_FILE, mode="w+", dtype=np.float32, shape=(n, len(first)))
+    metadata = {column: [] for column in METADATA_COLUMNS}
+    with open(DATASET_NAME, "rb") as f:
+        for i, video in enumerate(ijson.items(f, "item", use_float=True)):
+            vector = np.asarray(video["ada_v2"], dtype=np.float32)
+            embeddings[i] = vector / np.linalg.norm(vector)
+            for column in METADATA_COLUMNS:
+                # Missing values are stored as nulls, which keeps numeric columns numeric
+                metadata[column].append(video.get(column))
+    embeddings.flush()
+    print(f"✅ Saved {n} embeddings to '{EMBEDDINGS_FILE}'.")
+
+    pq.write_table(pa.table(metadata), METADATA_FILE)
+    print(f"✅ Saved video metadata to '{METADATA_FILE}'.")
+
+    print("🔨 Building the search index...")
+    faiss.write_index(build_index(embeddings), INDEX_FILE)
+    print(f"✅ Saved the search index to '{INDEX_FILE}'.")
+
+def build_index(embeddings: np.ndarray) -> faiss.Index:
+    """
+    Builds a scalar-quantized FAISS inner-product index over the normalized embeddings.
+
+    Since the rows are normalized, the inner product is the cosine similarity.
+    Quantization stores each value in fewer bytes, so the index uses less memory
+    and each search reads less of it. Small catalogs are scanned in full with
+    float16 values (half the memory, practically the same scores). Large ones use
+    an IVF index with 8-bit values (a quarter of the memory), which only scans the
+    clusters closest to the query.
+    """
+    n, d = embeddings.shape
+    if n >= IVF_MIN_VIDEOS:
+        quantizer = faiss.IndexFlatIP(d)
+        index = faiss.IndexIVFScalarQuantizer(
+            quantizer, d, IVF_NLIST, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+        )
+        sample = np.sort(np.random.default_rng(0).choice(n, size=min(n, IVF_TRAIN_SIZE), replace=False))
+        index.train(np.ascontiguousarray(embeddings[sample]))
+    else:
+        index = faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT)
+        index.train(np.ascontiguousarray(embeddings[:IVF_TRAIN_SIZE]))
+
+    for start in range(0, n, INDEX_ADD_BATCH_SIZE):
+        index.add(np.ascontiguousarray(embeddings[start:start + INDEX_ADD_BATCH_SIZE]))
+    return index
+
+if __name__ == "__main__":
+    main()